@@ -20,12 +20,13 @@
 
 import asyncio
 import datetime
+import functools
 import logging
 import re
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from enum import Enum, auto
-from typing import TYPE_CHECKING, Any, Callable, Coroutine, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, List, Optional, Tuple, Union
 
 import emoji
 import tzlocal
@@ -40,6 +41,9 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# emoji token, e.g. ':robot:', compiled once and shared by all labels
+EMOJI_PATTERN = re.compile(r":\w+:")
+
 TypeCallback = Optional[Union[Callable[..., Any], Coroutine[Any, Any, None], "BaseMessage"]]
 TypeKeyboard = List[List["MenuButton"]]
 
@@ -79,8 +83,12 @@ class MenuButton:
         btype: button type
         args: argument passed to the callback
         notification: send notification to user
+        web_app_url: URL of the web-app
+        lazy: the callback builds the message to open, it is called once on first selection
     """
 
+    __slots__ = ("label", "callback", "btype", "args", "notification", "web_app_url", "lazy")
+
     def __init__(
         self,
         label: str,
@@ -89,6 +97,7 @@ class MenuButton:
         args: Any = None,
         notification: bool = True,
         web_app_url: str = "",
+        lazy: bool = False,
     ):
         """Init MenuButton class."""
         self.label = emoji_replace(label)
@@ -97,6 +106,7 @@ class MenuButton:
         self.args = args
         self.notification = notification
         self.web_app_url = web_app_url
+        self.lazy = lazy
 
 
 class BaseMessage(ABC):
@@ -143,6 +153,9 @@ class BaseMessage(ABC):
         self.keyboard_previous: TypeKeyboard = [[]]
         self.content_previous: str = ""
 
+        # last inline keyboard generated, reused as long as the label and the buttons are unchanged
+        self._inline_keyboard_cache: Optional[Tuple[Any, InlineKeyboardMarkup]] = None
+
         # if 'home_after' is True, the navigation manager goes back to
         # the main menu after this message has been sent
         self.home_after = home_after
@@ -189,6 +202,7 @@ class BaseMessage(ABC):
         notification: bool = True,
         new_row: bool = False,
         web_app_url: str = "",
+        lazy: bool = False,
     ) -> None:
         """Add a button to keyboard attribute.
 
@@ -200,7 +214,12 @@ class BaseMessage(ABC):
             notification: send notification to user
             new_row: add a new row
             web_app_url: URL of the web-app
+            lazy: the callback builds the message to open, it is called once on first selection.
+                Only for menu messages, an inlined message can't open another menu
         """
+        if lazy and self.inlined:
+            raise ValueError(f"Lazy button '{label}' can't be added to inlined message {self.label}")
+
         # arrange buttons per row, depending on inlined property
         buttons_per_row = 2 if not self.inlined else 4
 
@@ -209,9 +228,9 @@ class BaseMessage(ABC):
 
         # add new row if last row is full or append to last row
         if new_row or len(self.keyboard[-1]) == buttons_per_row:
-            self.keyboard.append([MenuButton(label, callback, btype, args, notification, web_app_url)])
+            self.keyboard.append([MenuButton(label, callback, btype, args, notification, web_app_url, lazy)])
         else:
-            self.keyboard[-1].append(MenuButton(label, callback, btype, args, notification, web_app_url))
+            self.keyboard[-1].append(MenuButton(label, callback, btype, args, notification, web_app_url, lazy))
 
     async def edit_message(self) -> bool:
         """Request navigation controller to update current message."""
@@ -238,10 +257,17 @@ class BaseMessage(ABC):
 
     def gen_inline_keyboard_content(self) -> InlineKeyboardMarkup:
         """Generate keyboard content."""
+        if not self.input_field:
+            self.input_field = next((row[0].label for row in self.keyboard if row and row[0].label), "")
+        cache_key = (
+            self.label,
+            tuple(tuple((btn.label, btn.btype, btn.web_app_url) for btn in row) for row in self.keyboard),
+        )
+        if self._inline_keyboard_cache is not None and self._inline_keyboard_cache[0] == cache_key:
+            return self._inline_keyboard_cache[1]
+
         keyboard_buttons = []
         for row in self.keyboard:
-            if not self.input_field and row:
-                self.input_field = row[0].label
             button_array: List[InlineKeyboardButton] = []
             for btn in row:
                 if self.SEPARATOR in self.label or self.SEPARATOR in btn.label:
@@ -258,7 +284,9 @@ class BaseMessage(ABC):
                 else:
                     button_array.append(InlineKeyboardButton(text=btn.label, callback_data=lbl))
             keyboard_buttons.append(button_array)
-        return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+        keyboard_markup = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+        self._inline_keyboard_cache = (cache_key, keyboard_markup)
+        return keyboard_markup
 
     def is_alive(self) -> None:
         """Update message timestamp."""
@@ -277,8 +305,17 @@ class BaseMessage(ABC):
 
 def emoji_replace(label: str) -> str:
     """Replace emoji token with utf-16 code."""
-    match_emoji = re.findall(r"(:\w+:)", label)
-    for item in match_emoji:
-        emoji_str = emoji.emojize(item, language="alias")
-        label = label.replace(item, emoji_str)
-    return label
+    if ":" not in label:
+        return label  # no token, skip the regex
+    return EMOJI_PATTERN.sub(_emoji_token_replace, label)
+
+
+def _emoji_token_replace(match: "re.Match[str]") -> str:
+    """Convert a single emoji token, unknown tokens are left unchanged."""
+    return _emojize_token(match.group(0))
+
+
+@functools.lru_cache(maxsize=256)
+def _emojize_token(token: str) -> str:
+    """Convert an emoji token, cached since labels keep using the same few tokens."""
+    return emoji.emojize(token, language="alias")
@@ -80,6 +80,9 @@ class TelegramMenuSession:
         self.start_message_args: Optional[List[Any]] = None
         self.navigation_handler_class: Optional[Type[NavigationHandler]] = None
 
+        # created on demand by wait_for_session, so that it is bound to the running event loop
+        self._session_ready: Optional[asyncio.Event] = None
+
         # on different commands - answer in Telegram
         self.application.add_handler(CommandHandler(start_message, self._send_start_message))
         self.application.add_handler(MessageHandler(telegram.ext.filters.TEXT, self._button_select_callback))
@@ -108,21 +111,73 @@ class TelegramMenuSession:
             navigation_handler_class: optional class used to extend the base NavigationHandler
 
         """
+        self._set_start_message(start_message_class, start_message_args, navigation_handler_class)
+
+        if not self.scheduler.running:
+            self.scheduler.start()
+        if polling:
+            self.application.run_polling(stop_signals=stop_signals)
+
+    async def start_async(
+        self,
+        start_message_class: Type[BaseMessage],
+        start_message_args: Optional[List[Any]] = None,
+        navigation_handler_class: Optional[Type[NavigationHandler]] = None,
+    ) -> None:
+        """Set the start message and start polling updates from a running event loop.
+
+        Unlike start(), this method returns once polling has started, call stop_async() to stop it.
+
+        Args:
+            start_message_class: class used to create start message
+            start_message_args: optional arguments passed to the start class
+            navigation_handler_class: optional class used to extend the base NavigationHandler
+
+        """
+        self._set_start_message(start_message_class, start_message_args, navigation_handler_class)
+        if self.application.updater is None:
+            raise NavigationException("Application has no updater, polling is not available")
+
+        # the job queue, hence the scheduler, is started by the application
+        await self.application.initialize()
+        await self.application.start()
+        await self.application.updater.start_polling()
+
+    async def stop_async(self) -> None:
+        """Stop polling updates and shut down the application started with start_async()."""
+        if self.application.updater is not None and self.application.updater.running:
+            await self.application.updater.stop()
+        if self.application.running:
+            await self.application.stop()
+        await self.application.shutdown()
+
+    def _set_start_message(
+        self,
+        start_message_class: Type[BaseMessage],
+        start_message_args: Optional[List[Any]],
+        navigation_handler_class: Optional[Type[NavigationHandler]],
+    ) -> None:
+        """Check and store the classes used to create new sessions."""
+        navigation_handler_class = navigation_handler_class or NavigationHandler
+        self._validate_start_args(start_message_class, start_message_args, navigation_handler_class)
         self.start_message_class = start_message_class
         self.start_message_args = start_message_args
-        self.navigation_handler_class = navigation_handler_class or NavigationHandler
+        self.navigation_handler_class = navigation_handler_class
+
+    @staticmethod
+    def _validate_start_args(
+        start_message_class: Type[BaseMessage],
+        start_message_args: Optional[List[Any]] = None,
+        navigation_handler_class: Optional[Type[NavigationHandler]] = None,
+    ) -> None:
+        """Raise a NavigationException if the classes used to create new sessions are invalid."""
         if not issubclass(start_message_class, BaseMessage):
             raise NavigationException("start_message_class must be a BaseMessage!")
         if start_message_args is not None and not isinstance(start_message_args, list):
             raise NavigationException("start_message_args is not a list!")
-        if not issubclass(self.navigation_handler_class, NavigationHandler):
+        if navigation_handler_class is not None and not issubclass(navigation_handler_class, NavigationHandler):
             raise NavigationException("navigation_handler_class must be a NavigationHandler!")
 
-        if not self.scheduler.running:
-            self.scheduler.start()
-        if polling:
-            self.application.run_polling(stop_signals=stop_signals)
-
     async def _send_start_message(self, update: Update, context: CallbackContext[BT, UD, CD, BD]) -> None:
         """Start main message, app choice."""
         chat = update.effective_chat
@@ -132,13 +187,19 @@ class TelegramMenuSession:
             raise NavigationException("Navigation Handler class not defined")
         session = self.navigation_handler_class(self.application.bot, chat, self.scheduler)
         self.sessions.append(session)
-        if self.start_message_class is None:
-            raise NavigationException("Message class not defined")
-        if self.start_message_args is not None:
-            start_message = self.start_message_class(session, message_args=self.start_message_args)
-        else:
-            start_message = self.start_message_class(session)
-        await session.goto_menu(start_message, context)
+        try:
+            if self.start_message_class is None:
+                raise NavigationException("Message class not defined")
+            if self.start_message_args is not None:
+                start_message = self.start_message_class(session, message_args=self.start_message_args)
+            else:
+                start_message = self.start_message_class(session)
+            await session.goto_menu(start_message, context)
+        finally:
+            # the session is registered even if the start message failed, don't leave the waiters hanging
+            if self._session_ready is not None:
+                self._session_ready.set()
+                self._session_ready = None
 
     def get_session(self, chat_id: int = 0) -> Optional[NavigationHandler]:
         """Get session from list."""
@@ -147,6 +208,16 @@ class TelegramMenuSession:
             return None
         return sessions[0]
 
+    async def wait_for_session(self, chat_id: int = 0) -> NavigationHandler:
+        """Wait until a session is opened, return its navigation handler."""
+        session = self.get_session(chat_id)
+        while session is None:
+            if self._session_ready is None:
+                self._session_ready = asyncio.Event()
+            await self._session_ready.wait()
+            session = self.get_session(chat_id)
+        return session
+
     async def _get_location_handler(self, update: Update, context: CallbackContext[BT, UD, CD, BD]) -> None:
         if update.effective_chat is None or update.message is None or update.message.location is None:
             raise NavigationException("Incorrect session, location can't be updated")
@@ -446,6 +517,13 @@ class NavigationHandler:
             btn = menu_item.get_button(label)
             if not btn:
                 continue
+            if btn.lazy and btn.callback is not None and hasattr(btn.callback, "__call__"):
+                # the callback builds the sub-menu on first selection, keep it for the next ones
+                message = await call_function_EAFP(btn.callback, context)
+                if not isinstance(message, BaseMessage):
+                    raise NavigationException("Lazy button callback must return a BaseMessage!")
+                btn.callback = message
+                btn.lazy = False
             if isinstance(btn.callback, BaseMessage):
                 if btn.callback.inlined:
                     msg_id = await self._send_app_message(btn.callback, label, context)
@@ -614,15 +692,14 @@ class NavigationHandler:
         """Get message from message_queue matching attribute label_message."""
         return next(iter(x for x in self._message_queue if x.label == label_message), None)
 
-    async def send_poll(self, question: str, options: List[str]) -> None:
+    async def send_poll(self, question: str, options: Sequence[str]) -> None:
         """Send poll to user with question and options."""
         if self.scheduler.get_job(self.poll_name) is not None:
             await self.poll_delete()
-        options = [emoji_replace(x) for x in options]
         self._poll = await self._bot.send_poll(
             chat_id=self.chat_id,
             question=emoji_replace(question),
-            options=options,
+            options=[emoji_replace(x) for x in options],
             is_anonymous=False,
             open_period=self.POLL_DEADLINE,
         )
@@ -18,18 +18,17 @@
 
 """telegram_menu demonstrator."""
 
-from pathlib import Path
-
 from telegram_menu import TelegramMenuSession
-from tests.test_connection import MyNavigationHandler, StartMessage, init_logger
+from tests.test_connection import KEY_FILE, MyNavigationHandler, StartMessage, init_logger, read_api_key
 
 
 def run() -> None:
     """Run the demo example."""
     logger = init_logger(__name__)
 
-    with (Path.home() / ".telegram_menu" / "key.txt").open() as key_h:
-        api_key = key_h.read().strip()
+    api_key = read_api_key()
+    if not api_key:
+        raise KeyError(f"No API key found, set TELEGRAM_TEST_API_KEY or write it in {KEY_FILE}")
 
     logger.info(" >> Start the demo and wait forever, quit with CTRL+C...")
     TelegramMenuSession(api_key).start(start_message_class=StartMessage, navigation_handler_class=MyNavigationHandler)
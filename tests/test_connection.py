@@ -22,18 +22,35 @@ import asyncio
 import datetime
 import json
 import logging
+import logging.config
+import os
 import unittest
+from http import HTTPStatus
 from logging import Logger
 from pathlib import Path
-from typing import Any, Callable, Coroutine, List, Optional, Union
+from typing import Any, Callable, Coroutine, Dict, Iterator, List, NamedTuple, Optional, Tuple, Type, Union, cast
 
-from telegram import InlineKeyboardMarkup, Message, ReplyKeyboardMarkup
+import pytest
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from telegram import Bot, Chat, InlineKeyboardMarkup, Message, ReplyKeyboardMarkup, Update
+from telegram.request import BaseRequest, RequestData
 
 try:
     from typing_extensions import TypedDict
 except ImportError:
     from typing import TypedDict
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads  # type: ignore[assignment]
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None  # type: ignore[assignment]
+
+from telegram._utils.types import ODVInput
 from telegram.ext._callbackcontext import CallbackContext
 from telegram.ext._utils.types import BD, BT, CD, UD
 
@@ -41,14 +58,57 @@ import telegram_menu
 from telegram_menu import BaseMessage, ButtonType, MenuButton, NavigationHandler, TelegramMenuSession
 from telegram_menu._version import __raw_url__
 
+logger = logging.getLogger(__name__)
+
 KeyboardContent = List[Union[str, List[str]]]
 UpdateCallback = Union[Callable[[Any], None], Coroutine[Any, Any, None]]
-KeyboardTester = TypedDict("KeyboardTester", {"buttons": int, "output": List[int]})
-
-ROOT_FOLDER = Path(__file__).parent.parent
-
+KeyboardTester = NamedTuple("KeyboardTester", [("buttons", int), ("output", List[int])])
 UnitTestDict = TypedDict("UnitTestDict", {"description": str, "input": str, "output": str})
-TypePackageLogger = TypedDict("TypePackageLogger", {"package": str, "level": int})
+
+# resolved once, the paths don't change during the test session
+ROOT_FOLDER = Path(__file__).resolve().parent.parent
+KEY_FILE = Path.home() / ".telegram_menu" / "key.txt"
+
+RESOURCES_FOLDER = ROOT_FOLDER / "resources"
+PACKAGES_PNG = (RESOURCES_FOLDER / "packages.png").as_posix()
+STATS_WEBP = (RESOURCES_FOLDER / "stats_default.webp").as_posix()
+SETUP_PY = (ROOT_FOLDER / "setup.py").as_posix()
+CLASSES_PNG_URL = f"{__raw_url__}/resources/classes.png"
+
+# local files and remote urls, valid and invalid
+PICTURE_VECTORS_LOCAL = (PACKAGES_PNG, SETUP_PY)
+PICTURE_VECTORS_URLS = (CLASSES_PNG_URL, f"{__raw_url__}/setup.py")
+
+# format_list templates, one is picked for each line
+LINE_HEAD_TAIL = "<b>{}</b>: {}\n"
+LINE_HEAD = "<b>{}</b>\n"
+LINE_TAIL = "{}\n"
+
+# emoji tokens of the options keyboard
+EMOJI_PLAY = ":play_button:"
+EMOJI_PAUSE = ":pause_button:"
+EMOJI_DOOR = ":door:"
+EMOJI_VOLUME = ":speaker_medium_volume:"
+EMOJI_QUESTION = ":question:"
+
+EMOJI_VECTORS: List[UnitTestDict] = [
+    {"description": "No emoji", "input": "lbl", "output": "lbl"},
+    {"description": "Invalid emoji", "input": ":lbl:", "output": ":lbl:"},
+    {"description": "Empty string", "input": "", "output": ""},
+    {"description": "Valid emoji", "input": ":robot:", "output": "🤖"},
+    {"description": "Consecutive emoji", "input": ":robot:-:robot::", "output": "🤖-🤖:"},
+    {"description": "Consecutive emoji 2", "input": ":robot: , :ghost:", "output": "🤖 , 👻"},
+]
+KEYBOARD_VECTORS = (
+    KeyboardTester(buttons=2, output=[2]),
+    KeyboardTester(buttons=4, output=[2, 2]),
+    KeyboardTester(buttons=7, output=[2, 2, 2, 1]),
+)
+KEYBOARD_VECTORS_INLINED = (
+    KeyboardTester(buttons=2, output=[2]),
+    KeyboardTester(buttons=4, output=[4]),
+    KeyboardTester(buttons=6, output=[4, 2]),
+)
 
 
 class MyNavigationHandler(NavigationHandler):
@@ -58,17 +118,43 @@ class MyNavigationHandler(NavigationHandler):
         """Do Go Back logic."""
         return await self.select_menu_button("Back")
 
+    def is_displayed(self, message_id: Optional[int]) -> bool:
+        """Return True if the message is displayed, either as a menu or as an application message."""
+        return any(x.message_id == message_id for x in self._menu_queue + self._message_queue)
+
 
 class OptionsAppMessage(BaseMessage):
     """Options app message, show an example of a button with inline buttons."""
 
     LABEL = "options"
+    POLL_QUESTION = "Select one option:"
+    POLL_CHOICES = tuple(f"{EMOJI_PLAY} Option {x}" for x in range(6))
 
     def __init__(self, navigation: MyNavigationHandler, update_callback: Optional[List[UpdateCallback]] = None) -> None:
         """Init OptionsAppMessage class."""
         super().__init__(navigation, OptionsAppMessage.LABEL, inlined=True)
 
         self.play_pause = True
+        # only the first button depends on the play/pause state, the others are shared by both keyboards
+        # rows are stored as tuples so that editing the displayed keyboard can't alter them
+        self._static_rows: Tuple[Tuple[MenuButton, ...], ...] = (
+            (
+                MenuButton(":twisted_rightwards_arrows:", callback=self.picture_default, btype=ButtonType.PICTURE),
+                MenuButton(":chart_with_upwards_trend:", callback=self.picture_button, btype=ButtonType.PICTURE),
+                MenuButton(":chart_with_downwards_trend:", callback=self.picture_button2, btype=ButtonType.PICTURE),
+            ),
+            (
+                MenuButton(EMOJI_DOOR, callback=self.text_button, btype=ButtonType.MESSAGE),
+                MenuButton(EMOJI_VOLUME, callback=self.action_button),
+                MenuButton(
+                    EMOJI_QUESTION,
+                    self.action_poll,
+                    btype=ButtonType.POLL,
+                    args=[self.POLL_QUESTION, self.POLL_CHOICES],
+                ),
+            ),
+        )
+        self._keyboards: Dict[bool, Tuple[Tuple[MenuButton, ...], ...]] = {}
         if isinstance(update_callback, list):
             update_callback.append(self.app_update_display)
 
@@ -106,12 +192,12 @@ class OptionsAppMessage(BaseMessage):
     def picture_button(self) -> str:
         """Display a local picture."""
         self._toggle_play_button()
-        return (ROOT_FOLDER / "resources" / "packages.png").resolve().as_posix()
+        return PACKAGES_PNG
 
     def picture_button2(self) -> str:
         """Display a picture from a remote url."""
         self._toggle_play_button()
-        return f"{__raw_url__}/resources/classes.png"
+        return CLASSES_PNG_URL
 
     def _toggle_play_button(self) -> None:
         """Toggle the first button between play and pause mode."""
@@ -120,24 +206,21 @@ class OptionsAppMessage(BaseMessage):
     @staticmethod
     def action_poll(poll_answer: str) -> None:
         """Display poll answer."""
-        logging.info(f"Answer is {poll_answer}")
+        logger.info("Answer is %s", poll_answer)
+
+    def _build_keyboard(self, play_pause: bool) -> Tuple[Tuple[MenuButton, ...], ...]:
+        """Get the keyboard matching the play/pause state, build it on first use."""
+        if play_pause not in self._keyboards:
+            play_pause_button = MenuButton(
+                EMOJI_PLAY if play_pause else EMOJI_PAUSE, callback=self.sticker_default, btype=ButtonType.STICKER
+            )
+            first_row, second_row = self._static_rows
+            self._keyboards[play_pause] = ((play_pause_button, *first_row), second_row)
+        return self._keyboards[play_pause]
 
     def update(self) -> str:
         """Update message content."""
-        poll_question = "Select one option:"
-        poll_choices = [":play_button: Option " + str(x) for x in range(6)]
-        play_pause_button = ":play_button:" if self.play_pause else ":pause_button:"
-        self.keyboard = [
-            [
-                MenuButton(play_pause_button, callback=self.sticker_default, btype=ButtonType.STICKER),
-                MenuButton(":twisted_rightwards_arrows:", callback=self.picture_default, btype=ButtonType.PICTURE),
-                MenuButton(":chart_with_upwards_trend:", callback=self.picture_button, btype=ButtonType.PICTURE),
-                MenuButton(":chart_with_downwards_trend:", callback=self.picture_button2, btype=ButtonType.PICTURE),
-            ]
-        ]
-        self.add_button(":door:", callback=self.text_button, btype=ButtonType.MESSAGE)
-        self.add_button(":speaker_medium_volume:", callback=self.action_button)
-        self.add_button(":question:", self.action_poll, btype=ButtonType.POLL, args=[poll_question, poll_choices])
+        self.keyboard = [list(row) for row in self._build_keyboard(self.play_pause)]
         return "Status updated!"
 
 
@@ -179,8 +262,8 @@ class ThirdMenuMessage(BaseMessage):
         )
 
         self.action_message = ActionAppMessage(navigation)
-        option_message = OptionsAppMessage(navigation, update_callback)
-        self.add_button(label="Option", callback=option_message)
+        # the options message is only built when the button is selected for the first time
+        self.add_button(label="Option", callback=lambda: OptionsAppMessage(navigation, update_callback), lazy=True)
         self.add_button("Action", self.action_message)
         self.add_button_back()
         self.add_button("Back2", callback=navigation.goto_back)
@@ -200,7 +283,7 @@ class ThirdMenuMessage(BaseMessage):
 
     async def text_input(self, text: str, context: Optional[CallbackContext[BT, UD, CD, BD]] = None) -> None:
         """Process text received."""
-        logging.info(f"Text received: {text}")
+        logger.info("Text received: %s", text)
         await self.navigation.select_menu_button("Action")
 
 
@@ -215,7 +298,7 @@ class SecondMenuMessage(BaseMessage):
             navigation,
             SecondMenuMessage.LABEL,
             notification=False,
-            picture=(ROOT_FOLDER / "resources" / "packages.png").resolve().as_posix(),
+            picture=PACKAGES_PNG,
             expiry_period=datetime.timedelta(seconds=5),
             input_field="Enter an option",
         )
@@ -250,7 +333,7 @@ class StartMessage(BaseMessage):
     @staticmethod
     async def webapp_cb(webapp_data):
         """Webapp callback."""
-        data = json.loads(webapp_data)
+        data = json_loads(webapp_data)
         return (
             f"You selected the color with the HEX value <code>{data['hex']}</code>. "
             f"The corresponding RGB value is <code>{tuple(data['rgb'].values())}</code>."
@@ -266,160 +349,110 @@ class StartMessage(BaseMessage):
         return "Start message!"
 
 
-class Test(unittest.TestCase):
-    """The basic class that inherits unittest.TestCase."""
+def read_api_key() -> str:
+    """Get the API key of the test bot from the environment or from the key file, empty if not available."""
+    api_key = os.environ.get("TELEGRAM_TEST_API_KEY", "")
+    if not api_key and KEY_FILE.is_file():
+        api_key = KEY_FILE.read_text().strip()
+    return api_key
+
 
-    session: TelegramMenuSession
-    navigation: MyNavigationHandler
+API_KEY = read_api_key()
+
+
+@unittest.skipUnless(API_KEY, f"live bot test disabled, set TELEGRAM_TEST_API_KEY or create {KEY_FILE}")
+class Test(unittest.IsolatedAsyncioTestCase):
+    """The basic class that inherits unittest.IsolatedAsyncioTestCase."""
+
+    SESSION_TIMEOUT = 300  # seconds, to manually start the session from Telegram
+    session: Optional[TelegramMenuSession] = None
+    navigation: Optional[MyNavigationHandler] = None
     update_callback: List[UpdateCallback] = []
 
-    def setUp(self) -> None:
+    previous_policy: asyncio.AbstractEventLoopPolicy
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Create the session once for all the unit-tests, on the uvloop event loop if available."""
+        cls.previous_policy = asyncio.get_event_loop_policy()
+        if uvloop is not None:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        cls.session = TelegramMenuSession(api_key=API_KEY)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """Restore the event loop policy used before the unit-tests."""
+        asyncio.set_event_loop_policy(cls.previous_policy)
+
+    async def asyncSetUp(self) -> None:
         """Set-up the unit-test."""
         self.logger = init_logger(__name__)
-        with (Path.home() / ".telegram_menu" / "key.txt").open() as key_h:
-            self.api_key = key_h.read().strip()
-        Test.session = TelegramMenuSession(api_key=self.api_key)
 
-    def test_all(self):
-        """Create the session, tests start once the client has opened the session."""
-        asyncio.ensure_future(self.get_session(), loop=asyncio.get_event_loop())
-        Test.session.start(StartMessage, Test.update_callback, navigation_handler_class=MyNavigationHandler)
+    async def asyncTearDown(self) -> None:
+        """Stop polling and shut down the session."""
+        if Test.session is not None:
+            await Test.session.stop_async()
 
-    async def get_session(self):
-        """Get the session."""
-        self.logger.info("\n### Waiting for a manual request to start the Telegram session...\n")
-        while not hasattr(Test, "navigation") or Test.navigation is None:
-            nav = Test.session.get_session()
-            if nav is not None:
-                Test.navigation = nav
-            else:
-                await asyncio.sleep(1)
+    async def test_all(self) -> None:
+        """Start the session, tests start once the client has opened the session."""
+        if Test.session is None:
+            self.fail("Telegram session not available")
+        await Test.session.start_async(StartMessage, Test.update_callback, navigation_handler_class=MyNavigationHandler)
+        await self.get_session()
         await self.run_all()
-        asyncio.get_event_loop().stop()
+
+    async def get_session(self) -> None:
+        """Wait for the session."""
+        if Test.session is None:
+            self.fail("Telegram session not available")
+        self.logger.info("\n### Waiting for a manual request to start the Telegram session...\n")
+        navigation = await asyncio.wait_for(Test.session.wait_for_session(), timeout=self.SESSION_TIMEOUT)
+        self.assertIsInstance(navigation, MyNavigationHandler)
+        Test.navigation = cast(MyNavigationHandler, navigation)
 
     async def run_all(self):
         """Run all unit-tests."""
         self._test_1_wrong_api_key()
-        self._test_2_label_emoji()
         self._test_3_bad_start_message()
         await self._test_4_picture_path()
-        self._test_5_keyboard_combinations()
-        self._test_6_keyboard_combinations_inlined()
         await self._test_7_client_connection()
 
     def _test_1_wrong_api_key(self) -> None:
         """Test starting a client with wrong key."""
-        with self.assertRaises(KeyError):
-            TelegramMenuSession(None)  # type: ignore
-
-        with self.assertRaises(KeyError):
-            TelegramMenuSession(1234)  # type: ignore
-
-    def _test_2_label_emoji(self) -> None:
-        """Check replacement of emoji."""
-        vectors: List[UnitTestDict] = [
-            {"description": "No emoji", "input": "lbl", "output": "lbl"},
-            {"description": "Invalid emoji", "input": ":lbl:", "output": ":lbl:"},
-            {"description": "Empty string", "input": "", "output": ""},
-            {"description": "Valid emoji", "input": ":robot:", "output": "🤖"},
-            {"description": "Consecutive emoji", "input": ":robot:-:robot::", "output": "🤖-🤖:"},
-            {"description": "Consecutive emoji 2", "input": ":robot: , :ghost:", "output": "🤖 , 👻"},
-        ]
-        for vector in vectors:
-            button = MenuButton(label=vector["input"])
-            self.assertEqual(button.label, vector["output"], vector["description"])
+        for api_key in (None, 1234):
+            with self.subTest(api_key=api_key), self.assertRaises(KeyError):
+                TelegramMenuSession(api_key)  # type: ignore
 
     # noinspection PyTypeChecker
     def _test_3_bad_start_message(self) -> None:
-        """Test starting a client with bad start message."""
-        manager = TelegramMenuSession(self.api_key)
-
-        with self.assertRaises(telegram_menu.NavigationException):
-            manager.start(MenuButton)
+        """Test starting a client with bad start message, the shared session is left unchanged."""
+        if Test.session is None:
+            self.fail("Telegram session not available")
 
         with self.assertRaises(telegram_menu.NavigationException):
-            manager.start(StartMessage, 1)
+            Test.session.start(MenuButton)
+        self.assertIs(Test.session.start_message_class, StartMessage)
 
     async def _test_4_picture_path(self) -> None:
         """Test sending valid and invalid pictures."""
         if Test.session is None:
             self.fail("Telegram session not available")
 
-        # test sending local files, valid and invalid
-        vectors_local: List[str] = [
-            (ROOT_FOLDER / "resources" / "packages.png").resolve().as_posix(),
-            (ROOT_FOLDER / "setup.py").resolve().as_posix(),
-        ]
-        for vector in vectors_local:
-            messages = await Test.session.broadcast_picture(vector)
-            self.assertIsInstance(messages, List)
-            self.assertEqual(len(messages), 1)
-            self.assertIsInstance(messages[0], Message)
-
-        # test sending remote urls, valid and invalid
-        vectors_urls: List[str] = [
-            f"{__raw_url__}/resources/classes.png",
-            f"{__raw_url__}/setup.py",
-        ]
-        for vector in vectors_urls:
-            messages = await Test.session.broadcast_picture(vector)
-            self.assertIsInstance(messages, List)
-            self.assertEqual(len(messages), 1)
-            self.assertIsInstance(messages[0], Message)
-
-        sticker_path = (ROOT_FOLDER / "resources" / "stats_default.webp").resolve().as_posix()
-        messages = await Test.session.broadcast_sticker(sticker_path=sticker_path)
-        self.assertIsInstance(messages, List)
-        self.assertEqual(len(messages), 1)
-        self.assertIsInstance(messages[0], Message)
-
-    def _test_5_keyboard_combinations(self) -> None:
-        """Run the client test."""
-        if Test.session is None:
-            self.fail("Telegram session not available")
-        vectors_inlined: List[KeyboardTester] = [
-            {"buttons": 2, "output": [2]},
-            {"buttons": 4, "output": [2, 2]},
-            {"buttons": 7, "output": [2, 2, 2, 1]},
-        ]
-        for vector in vectors_inlined:
-            msg_test = StartMessage(Test.navigation)
-            msg_test.keyboard = []
-            for _ in range(vector["buttons"]):
-                msg_test.add_button(label=str(_), callback=StartMessage.run_and_notify)
-            if msg_test.inlined:
-                content = msg_test.gen_inline_keyboard_content()
-            else:
-                content = msg_test.gen_keyboard_content()
-            self.assertTrue(isinstance(content, ReplyKeyboardMarkup))
-            if isinstance(content, ReplyKeyboardMarkup):
-                self.assertEqual([len(x) for x in content.keyboard], vector["output"], str(vector["buttons"]))
-
-    def _test_6_keyboard_combinations_inlined(self) -> None:
-        """Run the client test."""
-        if Test.session is None or Test.navigation is None:
-            self.fail("Telegram session not available")
-        vectors_inlined: List[KeyboardTester] = [
-            {"buttons": 2, "output": [2]},
-            {"buttons": 4, "output": [4]},
-            {"buttons": 6, "output": [4, 2]},
-        ]
-        for vector in vectors_inlined:
-            msg_test = ActionAppMessage(Test.navigation)
-            msg_test.keyboard = []
-            for _ in range(vector["buttons"]):
-                msg_test.add_button(label=str(_), callback=StartMessage.run_and_notify)
-            if msg_test.inlined:
-                content = msg_test.gen_inline_keyboard_content()
-            else:
-                content = msg_test.gen_keyboard_content()
-            self.assertTrue(isinstance(content, InlineKeyboardMarkup))
-            if isinstance(content, InlineKeyboardMarkup):
-                self.assertEqual([len(x) for x in content.inline_keyboard], vector["output"], str(vector["buttons"]))
+        # test sending local files and remote urls, valid and invalid, and a sticker, all uploads run concurrently
+        vectors = PICTURE_VECTORS_LOCAL + PICTURE_VECTORS_URLS
+        results = await asyncio.gather(
+            *(Test.session.broadcast_picture(vector) for vector in vectors),
+            Test.session.broadcast_sticker(sticker_path=STATS_WEBP),
+        )
+        for path, messages in zip(vectors + (STATS_WEBP,), results):
+            with self.subTest(path=path):
+                self.assertIsInstance(messages, List)
+                self.assertEqual(len(messages), 1)
+                self.assertIsInstance(messages[0], Message)
 
     async def _test_7_client_connection(self) -> None:
         """Run the client test."""
-        if not hasattr(Test, "session") or not hasattr(Test, "navigation"):
+        if Test.session is None or Test.navigation is None:
             self.fail("Telegram session not available")
         _navigation = Test.navigation
 
@@ -430,90 +463,350 @@ class Test(unittest.TestCase):
         # select 'Action' menu from home, check that level is still 'Home' since flag 'home_after' is True
         msg_home = await _navigation.select_menu_button("Action")
         self.assertNotEqual(msg_home, -1)
-        await asyncio.sleep(0.5)
+        self.assertTrue(_navigation.is_displayed(msg_home))
 
         await self.go_check_id(label="Home", expected_id=msg_home)
 
         # Open second menu and check that message id has increased
         msg_menu2_id = await _navigation.select_menu_button("Second menu")
         self.assertGreater(msg_menu2_id, 1)
-        await asyncio.sleep(0.5)
+        self.assertTrue(_navigation.is_displayed(msg_menu2_id))
 
         # Open third menu and check that message id has increased
         msg_menu3_id = await _navigation.select_menu_button("Third menu")
         self.assertGreater(msg_menu3_id, msg_menu2_id)
-        await asyncio.sleep(0.5)
+        self.assertTrue(_navigation.is_displayed(msg_menu3_id))
 
         # Select option button and check that message id has increased
         msg_option_id = await _navigation.select_menu_button("Option")
         self.assertGreater(msg_option_id, msg_menu3_id)
-        await asyncio.sleep(0.5)
+        self.assertTrue(_navigation.is_displayed(msg_option_id))
 
         # go back from each sub-menu
-        await self.go_check_id(label="Back")
-        await self.go_check_id(label="Back")
+        await self.go_check_sequence("Back", "Back")
 
         # go home from each sub-menu
-        await self.go_check_id(label="Second menu")
-        await self.go_check_id(label="Home")
-
-        await self.go_check_id(label="Second menu")
-        await self.go_check_id(label="Third menu")
-        await self.go_check_id(label="Home")
+        await self.go_check_sequence("Second menu", "Home")
+        await self.go_check_sequence("Second menu", "Third menu", "Home")
+        await self.go_check_sequence("Second menu", "Third menu", "Option")
 
-        await self.go_check_id(label="Second menu")
-        await self.go_check_id(label="Third menu")
-        await self.go_check_id(label="Option")
-        await asyncio.sleep(0.5)
-
-        # run the update callback to trigger edition
+        # run the update callbacks to trigger edition, each one edits its own message so they run concurrently
+        coroutines: List[Coroutine[Any, Any, None]] = []
         for callback in Test.update_callback:
             if asyncio.iscoroutinefunction(callback):
-                await callback()
+                coroutines.append(callback())
             else:
                 callback()
+        await asyncio.gather(*coroutines)
 
     async def go_check_id(self, label: str, expected_id: Optional[int] = None) -> None:
         """Select an entry."""
+        if Test.navigation is None:
+            self.fail("Telegram session not available")
         msg_id = await Test.navigation.select_menu_button(label)
         if expected_id is not None:
             self.assertEqual(msg_id, expected_id)
-        await asyncio.sleep(0.2)
+        self.assertTrue(Test.navigation.is_displayed(msg_id))
+
+    async def go_check_sequence(self, *labels: str) -> None:
+        """Select entries one after the other, each selection depends on the menu opened by the previous one."""
+        for label in labels:
+            await self.go_check_id(label)
+
+
+class OfflineRequest(BaseRequest):
+    """Request backend answering the Bot API locally, with increasing message ids."""
+
+    def __init__(self) -> None:
+        """Init OfflineRequest class."""
+        self.endpoints: List[str] = []
+        self._message_id = 0
+
+    async def initialize(self) -> None:
+        """Nothing to initialize."""
+
+    async def shutdown(self) -> None:
+        """Nothing to shutdown."""
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout: ODVInput[float] = BaseRequest.DEFAULT_NONE,
+        write_timeout: ODVInput[float] = BaseRequest.DEFAULT_NONE,
+        connect_timeout: ODVInput[float] = BaseRequest.DEFAULT_NONE,
+        pool_timeout: ODVInput[float] = BaseRequest.DEFAULT_NONE,
+    ) -> Tuple[int, bytes]:
+        """Record the endpoint and return a canned response, timeouts are ignored."""
+        endpoint = url.rsplit("/", 1)[-1]
+        self.endpoints.append(endpoint)
+        result: Any = True
+        if endpoint == "getMe":
+            result = {"id": 1234, "is_bot": True, "first_name": "bot", "username": "offline_bot"}
+        elif endpoint == "getUpdates":
+            await asyncio.sleep(0.01)  # long polling, no update received
+            result = []
+        elif endpoint.startswith("send"):
+            self._message_id += 1
+            result = {"message_id": self._message_id, "date": 0, "chat": {"id": 1, "type": Chat.PRIVATE}}
+        return HTTPStatus.OK, json.dumps({"ok": True, "result": result}).encode()
+
+
+@pytest.fixture(name="offline_session")
+def fixture_offline_session(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> TelegramMenuSession:
+    """Session with a bot answered by the offline Bot API."""
+    session = TelegramMenuSession("1234:offline", persistence_path=(tmp_path / "persistence").as_posix())
+    # the bot keeps a request for getUpdates and another one for the other methods
+    monkeypatch.setattr(session.application.bot, "_request", (OfflineRequest(), OfflineRequest()))
+    return session
+
+
+@pytest.fixture(name="offline_request")
+def fixture_offline_request() -> OfflineRequest:
+    """Offline Bot API, keeping the list of requested endpoints."""
+    return OfflineRequest()
+
+
+@pytest.fixture(name="navigation")
+def fixture_navigation(offline_request: OfflineRequest) -> MyNavigationHandler:
+    """Navigation handler with a bot answered by the offline Bot API."""
+    chat = Chat(id=1, type=Chat.PRIVATE, first_name="test")
+    return MyNavigationHandler(Bot("1234:offline", request=offline_request), chat, AsyncIOScheduler())
+
+
+@pytest.mark.parametrize("vector", EMOJI_VECTORS, ids=[x["description"] for x in EMOJI_VECTORS])
+def test_label_emoji(vector: UnitTestDict) -> None:
+    """Check replacement of emoji."""
+    button = MenuButton(label=vector["input"])
+    assert button.label == vector["output"], vector["description"]
+
+
+@pytest.mark.parametrize("vector", KEYBOARD_VECTORS, ids=[str(x.buttons) for x in KEYBOARD_VECTORS])
+def test_keyboard_combinations(navigation: MyNavigationHandler, vector: KeyboardTester) -> None:
+    """Check the layout of a menu keyboard."""
+    msg_test = StartMessage(navigation)
+    msg_test.keyboard = []
+    for _ in range(vector.buttons):
+        msg_test.add_button(label=str(_), callback=StartMessage.run_and_notify)
+    content = msg_test.gen_inline_keyboard_content() if msg_test.inlined else msg_test.gen_keyboard_content()
+    assert isinstance(content, ReplyKeyboardMarkup)
+    assert [len(x) for x in content.keyboard] == vector.output, str(vector.buttons)
+
+
+@pytest.mark.parametrize("vector", KEYBOARD_VECTORS_INLINED, ids=[str(x.buttons) for x in KEYBOARD_VECTORS_INLINED])
+def test_keyboard_combinations_inlined(navigation: MyNavigationHandler, vector: KeyboardTester) -> None:
+    """Check the layout of an inlined message keyboard."""
+    msg_test = ActionAppMessage(navigation)
+    msg_test.keyboard = []
+    for _ in range(vector.buttons):
+        msg_test.add_button(label=str(_), callback=StartMessage.run_and_notify)
+    content = msg_test.gen_inline_keyboard_content() if msg_test.inlined else msg_test.gen_keyboard_content()
+    assert isinstance(content, InlineKeyboardMarkup)
+    assert [len(x) for x in content.inline_keyboard] == vector.output, str(vector.buttons)
+
+
+@pytest.mark.parametrize(
+    "start_args",
+    [(MenuButton, None, None), (StartMessage, 1, None), (StartMessage, None, StartMessage)],
+    ids=["message_class", "message_args", "navigation_class"],
+)
+def test_bad_start_message(start_args: Tuple[Any, Any, Any]) -> None:
+    """Check the validation of the classes used to start a session, no session is needed."""
+    with pytest.raises(telegram_menu.NavigationException):
+        TelegramMenuSession._validate_start_args(*start_args)
+
+
+def test_inline_keyboard_cache(navigation: MyNavigationHandler) -> None:
+    """Check that the inline keyboard is rendered again only when its buttons change."""
+    msg_test = OptionsAppMessage(navigation)
+    msg_test.update()
+    content_play = msg_test.gen_inline_keyboard_content()
+    msg_test.play_pause = not msg_test.play_pause
+    msg_test.update()
+    content_pause = msg_test.gen_inline_keyboard_content()
+    assert content_pause is not content_play
+    assert content_pause.inline_keyboard[0][0].text != content_play.inline_keyboard[0][0].text
+    assert msg_test.gen_inline_keyboard_content() is content_pause
+
+
+def test_navigation_offline(navigation: MyNavigationHandler, offline_request: OfflineRequest) -> None:
+    """Check the menu navigation against a local Bot API, without network."""
+
+    async def navigate() -> List[Optional[int]]:
+        message_ids: List[Optional[int]] = [await navigation.goto_menu(StartMessage(navigation))]
+        for label in ("Second menu", "Third menu", "Option", "Back", "Home", "Action"):
+            message_ids.append(await navigation.select_menu_button(label))
+        return message_ids
+
+    # the action message is sent as message 7, then goes back home to the start menu
+    assert asyncio.run(navigate()) == [1, 2, 3, 4, 5, 6, 6]
+    assert offline_request.endpoints.count("sendMessage") + offline_request.endpoints.count("sendPhoto") == 7
+
+
+def test_lazy_button_built_once(navigation: MyNavigationHandler) -> None:
+    """Check that a lazy button builds its message on first selection, then reuses it."""
+    start_message = StartMessage(navigation)
+    built: List[OptionsAppMessage] = []
+
+    def build_options() -> OptionsAppMessage:
+        built.append(OptionsAppMessage(navigation))
+        return built[-1]
+
+    start_message.add_button(label="Lazy", callback=build_options, lazy=True)
+
+    async def select_twice() -> None:
+        await navigation.goto_menu(start_message)
+        await navigation.select_menu_button("Lazy")
+        await navigation.select_menu_button("Lazy")
+
+    asyncio.run(select_twice())
+    button = start_message.get_button("Lazy")
+    assert len(built) == 1
+    assert button is not None and button.callback is built[0]
+
+
+def test_lazy_button_inlined_rejected(navigation: MyNavigationHandler) -> None:
+    """Check that a lazy button can't be added to an inlined message."""
+    options_message = OptionsAppMessage(navigation)
+    with pytest.raises(ValueError):
+        options_message.add_button(label="Lazy", callback=lambda: StartMessage(navigation), lazy=True)
+
+
+def test_session_start_stop_offline(offline_session: TelegramMenuSession) -> None:
+    """Check that a session started from a running event loop polls until it is stopped."""
+
+    async def start_stop() -> bool:
+        await offline_session.start_async(StartMessage, navigation_handler_class=MyNavigationHandler)
+        updater = offline_session.application.updater
+        polling = offline_session.application.running and updater is not None and updater.running
+        await offline_session.stop_async()
+        return polling
+
+    assert asyncio.run(start_stop())
+    assert not offline_session.application.running
+
+
+class FailingStartMessage(StartMessage):
+    """Start message that can't be displayed."""
+
+    def update(self) -> str:
+        """Fail to build the message content."""
+        raise ValueError("content not available")
+
+
+@pytest.mark.parametrize("start_message_class", [StartMessage, FailingStartMessage], ids=["sent", "failed"])
+def test_wait_for_session_offline(offline_session: TelegramMenuSession, start_message_class: Type[BaseMessage]) -> None:
+    """Check that a /start command wakes up the task waiting for the session, even if the start message fails."""
+    start_command = {
+        "update_id": 1,
+        "message": {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": 1, "type": Chat.PRIVATE, "first_name": "test"},
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+    async def open_session() -> NavigationHandler:
+        await offline_session.start_async(start_message_class, navigation_handler_class=MyNavigationHandler)
+        try:
+            waiting = asyncio.create_task(offline_session.wait_for_session())
+            await asyncio.sleep(0)  # the task is waiting before the command is received
+            update = Update.de_json(start_command, offline_session.application.bot)
+            await offline_session.application.process_update(update)
+            return await asyncio.wait_for(waiting, timeout=1)
+        finally:
+            await offline_session.stop_async()
+
+    navigation = asyncio.run(open_session())
+    assert isinstance(navigation, MyNavigationHandler)
+    assert navigation.chat_id == 1
+
+
+@pytest.mark.parametrize(
+    "args_array, expected",
+    [
+        (["title"], "<b>title</b>"),
+        ([["name", "value"]], "<b>name</b>: value\n"),
+        ([["name", ""]], "<b>name</b>\n"),
+        ([["", "value"]], "value\n"),
+        ([["", ""]], "\n"),
+        ([["name"]], "<b>name</b>\n"),
+    ],
+    ids=["not_list", "head_tail", "head", "tail", "empty", "single"],
+)
+def test_format_list(args_array: KeyboardContent, expected: str) -> None:
+    """Check the html formatting of each kind of line."""
+    assert format_list(args_array) == expected
+
+
+@pytest.fixture(name="logging_state")
+def fixture_logging_state() -> Iterator[None]:
+    """Restore the loggers configured by init_logger, so that the next tests log as before."""
+    loggers = [logging.getLogger(name) for name in ("", "apscheduler", "httpx", "telegram_menu", __name__)]
+    saved = [(x.handlers[:], x.level, x.propagate, x.disabled) for x in loggers]
+    yield
+    for current_logger, (handlers, level, propagate, disabled) in zip(loggers, saved):
+        for handler in current_logger.handlers:
+            if handler not in handlers:
+                handler.close()
+        current_logger.handlers[:] = handlers
+        current_logger.setLevel(level)
+        current_logger.propagate = propagate
+        current_logger.disabled = disabled
+
+
+@pytest.mark.usefixtures("logging_state")
+def test_init_logger_handlers() -> None:
+    """Check that initializing the loggers twice doesn't stack console handlers."""
+    init_logger(__name__)
+    test_logger = init_logger(__name__)
+    assert len(test_logger.handlers) == 1
+    assert len(logging.getLogger("telegram_menu").handlers) == 1
 
 
 def init_logger(current_logger) -> Logger:
-    """Initialize logger properties."""
-    _packages: List[TypePackageLogger] = [
-        {"package": "apscheduler", "level": logging.WARNING},
-        {"package": "telegram_menu", "level": logging.DEBUG},
-        {"package": current_logger, "level": logging.DEBUG},
-    ]
-    log_formatter = logging.Formatter(
-        fmt="%(asctime)s [%(name)s] [%(levelname)s]  %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+    """Initialize logger properties.
+
+    The configuration applies to the whole process: dictConfig closes every handler already created, even the
+    ones attached to other loggers, and replaces the handlers of the loggers listed here.
+    """
+    logging.config.dictConfig(
+        {
+            "version": 1,
+            "disable_existing_loggers": False,
+            "formatters": {
+                "default": {
+                    "format": "%(asctime)s [%(name)s] [%(levelname)s]  %(message)s",
+                    "datefmt": "%Y-%m-%d %H:%M:%S",
+                }
+            },
+            "handlers": {"console": {"class": "logging.StreamHandler", "formatter": "default"}},
+            "loggers": {
+                "apscheduler": {"level": "WARNING", "handlers": ["console"], "propagate": False},
+                "httpx": {"level": "WARNING", "handlers": ["console"], "propagate": False},
+                "telegram_menu": {"level": "DEBUG", "handlers": ["console"], "propagate": False},
+                current_logger: {"level": "DEBUG", "handlers": ["console"], "propagate": False},
+            },
+        }
     )
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(log_formatter)
-    _logger = logging.getLogger(current_logger)
-    for _package in _packages:
-        _logger = logging.getLogger(_package["package"])
-        _logger.setLevel(_package["level"])
-        _logger.addHandler(console_handler)
-        _logger.propagate = False
-    return _logger
+    return logging.getLogger(current_logger)
 
 
 def format_list(args_array: KeyboardContent) -> str:
     """Format array of strings in html, first element bold."""
-    content = ""
+    parts: List[str] = []
     for line in args_array:
         if not isinstance(line, list):
-            content += f"<b>{line}</b>"
+            parts.append(f"<b>{line}</b>")
             continue
-        if line[0]:
-            content += f"<b>{line[0]}</b>"
-            if line[1]:
-                content += ": "
-        if line[1]:
-            content += line[1]
-        content += "\n"
-    return content
+        head, tail = line[0], line[1] if len(line) > 1 else ""
+        if head and tail:
+            parts.append(LINE_HEAD_TAIL.format(head, tail))
+        elif head:
+            parts.append(LINE_HEAD.format(head))
+        else:
+            parts.append(LINE_TAIL.format(tail))
+    return "".join(parts)